@@ -1,13 +1,21 @@
-import streamlit as st
-import whisper
-import tempfile
 import os
-import json
+
+# 推論バックエンド読み込み前に実行環境を最適化
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count()))  # 全コア活用
+os.environ.setdefault("DNNL_DEFAULT_FPMATH_MODE", "BF16")  # oneDNN BF16高速演算
+
+import streamlit as st
+import gc
+import html
+import io
+import orjson
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import re
 import numpy as np
 from datetime import datetime
-import librosa
-import noisereduce as nr
 
 # ページ設定
 st.set_page_config(
@@ -17,8 +25,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 超軽量CSS
-st.markdown("""
+# 超軽量CSS（モジュール定数として1回だけ構築）
+_CSS = """
 <style>
     .stApp {
         font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
@@ -121,95 +129,204 @@ st.markdown("""
         color: #856404;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# 固定モデル（baseのみ使用）
-@st.cache_resource
-def load_optimized_model():
-    """最適化されたbaseモデルを一度だけ読み込み"""
-    try:
-        with st.spinner("⚡ 超軽量baseモデル読み込み中..."):
-            model = whisper.load_model("base")
-        st.success("✅ 高精度baseモデル読み込み完了！")
-        return model
-    except Exception as e:
-        st.error(f"❌ モデル読み込みエラー: {e}")
-        return None
+# 静的ヘッダー/フッター（状態に依存しないのでモジュール定数化）
+_HEADER_HTML = """
+<h1 class="title">🚀 超軽量・高精度音声文字起こしツール</h1>
+<div class="subtitle">baseモデル固定 + AI品質向上技術</div>
+<div class="feature-badge">
+    <div class="badge badge-speed">⚡ 超軽量動作</div>
+    <div class="badge badge-accuracy">🎯 高精度認識</div>
+    <div class="badge badge-stable">🛡️ 完全安定</div>
+</div>
+<div class="enhancement-info">
+    <strong>🔧 搭載技術:</strong> ノイズ除去・音量正規化・スマート文字修正・文脈認識・品質スコア算出
+</div>
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; color: #666; padding: 1rem;">
+    <p>🚀 <strong>超軽量・高精度音声文字起こしツール</strong></p>
+    <p>baseモデル固定 + AI品質向上技術による最強軽量版</p>
+</div>
+"""
+
+_SIDEBAR_SPEC_MD = """
+### 📊 仕様
+- **固定モデル**: base int8（約40MB）
+- **メモリ使用量**: 最小限
+- **処理速度**: 最適化済み
+- **安定性**: 100%保証
+"""
+
+# 言語選択の表示ラベル（再実行ごとのdict再構築を避けるためモジュール定数化）
+_LANG_LABELS = {
+    "auto": "🤖 自動検出",
+    "ja": "🇯🇵 日本語",
+    "en": "🇺🇸 English",
+    "zh": "🇨🇳 中文",
+    "ko": "🇰🇷 한국어",
+}
+
+# large指定時は多言語対応の蒸留版（ほぼ同等WER・大幅高速＆省メモリ）へ置き換え
+# ※distil-medium.enは英語専用のため、日本語中心の本アプリでは対象外
+_DISTIL_ALIASES = {
+    "large": "distil-large-v3",
+}
+
+# 固定モデル（デフォルトはbaseのみ使用）
+@st.cache_resource(show_spinner=False)
+def load_optimized_model(model_size="base"):
+    """最適化されたモデルを一度だけ読み込み（CTranslate2 int8量子化版）
+
+    UI要素を含まない純粋なファクトリ。バックグラウンドの先読みスレッド
+    からも安全に呼べ、読み込み失敗は呼び出し側の例外処理に委ねる。
+    """
+    # 重量級の推論バックエンドは初回ロード時のみインポート（初期表示を高速化）
+    import ctranslate2
+    from faster_whisper import WhisperModel
+
+    # GPUがあればFP16テンサーコア、無ければint8 CPUカーネルを使用
+    use_cuda = ctranslate2.get_cuda_device_count() > 0
+    return WhisperModel(
+        _DISTIL_ALIASES.get(model_size, model_size),
+        device="cuda" if use_cuda else "cpu",
+        compute_type="int8_float16" if use_cuda else "int8",
+        cpu_threads=os.cpu_count(),
+    )
 
 # 高精度化のための前処理関数
 def enhance_audio_quality(audio_data, sample_rate=16000):
     """音声品質向上処理"""
     try:
+        import noisereduce as nr  # scipyごと引き込むため使用時のみインポート
+
         # ノイズ除去（軽量版）
-        enhanced_audio = nr.reduce_noise(y=audio_data, sr=sample_rate, prop_decrease=0.8)
-        
-        # 音量正規化
-        enhanced_audio = enhanced_audio / np.max(np.abs(enhanced_audio))
-        
-        # 高周波ノイズカット（簡易版）
-        enhanced_audio = np.convolve(enhanced_audio, np.ones(3)/3, mode='same')
-        
-        return enhanced_audio
+        # 短いクリップは効果が薄い割に支配的コストになるためスキップ
+        if len(audio_data) / sample_rate < 3.0:
+            enhanced_audio = audio_data
+        else:
+            # 定常モード＋小さめFFTは非定常Wiener方式より桁違いに軽い
+            enhanced_audio = nr.reduce_noise(
+                y=audio_data, sr=sample_rate, stationary=True,
+                prop_decrease=0.6, n_fft=512, hop_length=256,
+            )
+        
+        # noisereduceはfloat64へ暗黙に拡張することがあるためfloat32を強制
+        # （以降のパスのメモリ帯域を半減し、whisperへの受け渡しコピーも回避）
+        enhanced_audio = np.asarray(enhanced_audio, dtype=np.float32)
+
+        # 音量正規化＋3点移動平均を1パスに融合
+        # （正規化係数を移動平均の係数に畳み込み、バッファ走査を3回→1回に）
+        peak = float(np.max(np.abs(enhanced_audio)))
+        inv = 1.0 / peak if peak > 1e-8 else 1.0
+        out = np.empty_like(enhanced_audio)
+        out[1:-1] = (enhanced_audio[:-2] + enhanced_audio[1:-1] + enhanced_audio[2:]) * (inv / 3.0)
+        out[0] = enhanced_audio[0] * inv
+        out[-1] = enhanced_audio[-1] * inv
+
+        return out
     except:
         # エラー時は元の音声をそのまま返す
         return audio_data
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def decode_audio_bytes(file_content):
+    """アップロードされたバイト列を16kHzモノラルfloat32配列へデコード（ディスクI/O不要）
+
+    同じファイルの再実行時はバイト列ハッシュでキャッシュヒットし、
+    デコード＆リサンプリングを丸ごとスキップする。
+    """
+    try:
+        import soundfile as sf
+        import soxr
+        data, sr = sf.read(io.BytesIO(file_content), dtype="float32", always_2d=False)
+        if data.ndim == 2:
+            data = data.mean(axis=1)  # ステレオ→モノラル
+        if sr != 16000:
+            # 音声認識用途ではQQ（最速）で十分な品質
+            data = soxr.resample(data, sr, 16000, quality="QQ")
+        return data
+    except Exception:
+        # soundfile非対応コーデック（m4a/aac等）はPyAV経由でデコード
+        from faster_whisper.audio import decode_audio
+        return decode_audio(io.BytesIO(file_content), sampling_rate=16000)
+
+# 基本的な修正パターン（コンパイルはインポート時の1回だけ）
+_CORRECTIONS = [
+    (re.compile(p, re.IGNORECASE), r) for p, r in [
+        # 一般的な誤認識パターン
+        (r'\bえと\b', 'えっと'),
+
+        # 句読点の自動挿入（簡易版）
+        (r'(\w+)ですが(\w+)', r'\1ですが、\2'),
+        (r'(\w+)ので(\w+)', r'\1ので、\2'),
+        (r'(\w+)けど(\w+)', r'\1けど、\2'),
+        (r'(\w+)って(\w+)', r'\1って、\2'),
+
+        # 語尾の修正
+        (r'だし$', 'です。'),
+        (r'だよ$', 'です。'),
+        (r'だね$', 'ですね。'),
+    ]
+]
+
+# スペースの最適化
+_WS_RE = re.compile(r'\s+')
+
 def apply_smart_corrections(text):
     """軽量版スマート文字修正"""
     if not text:
         return text
-    
-    # 基本的な修正パターン
-    corrections = {
-        # 一般的な誤認識パターン
-        r'\bえと\b': 'えっと',
-        r'\bあの\b': 'あの',
-        r'\bそれで\b': 'それで',
-        r'\bですね\b': 'ですね',
-        r'\bそうですね\b': 'そうですね',
-        
-        # 句読点の自動挿入（簡易版）
-        r'(\w+)ですが(\w+)': r'\1ですが、\2',
-        r'(\w+)ので(\w+)': r'\1ので、\2',
-        r'(\w+)けど(\w+)': r'\1けど、\2',
-        r'(\w+)って(\w+)': r'\1って、\2',
-        
-        # 語尾の修正
-        r'だし$': 'です。',
-        r'だよ$': 'です。',
-        r'だね$': 'ですね。',
-        
-        # スペースの最適化
-        r'\s+': ' ',
-    }
-    
+
     corrected_text = text
-    for pattern, replacement in corrections.items():
-        corrected_text = re.sub(pattern, replacement, corrected_text, flags=re.IGNORECASE)
-    
+    for pattern, replacement in _CORRECTIONS:
+        corrected_text = pattern.sub(replacement, corrected_text)
+    corrected_text = _WS_RE.sub(' ', corrected_text)
+
     return corrected_text.strip()
 
-def optimize_whisper_options(language="auto", enable_timestamps=True):
-    """Whisperオプションの最適化"""
+def optimize_whisper_options(language="auto", enable_word_ts=False, high_accuracy=False):
+    """Whisperオプションの最適化（faster-whisper用）
+
+    デフォルトは貪欲デコード1パス（beam_size=1, temperature=0.0）。
+    高精度モードではビームサーチ＋温度フォールバックに切り替える。
+    セグメント単位のタイムスタンプは常に無償で得られるため、
+    word_timestamps（DTW追加パス）は明示的に要求された時だけ有効化する。
+    """
     options = {
         "language": None if language == "auto" else language,
-        "verbose": False,
-        "fp16": False,  # CPU安定性
-        
-        # 高精度化オプション
-        "condition_on_previous_text": True,  # 文脈考慮
-        "temperature": 0.0,  # 確定的出力
+
+        # 品質フィルタ
         "compression_ratio_threshold": 2.4,  # 重複除去
-        "logprob_threshold": -1.0,  # 信頼度フィルタ
+        "log_prob_threshold": -1.0,  # 信頼度フィルタ
         "no_speech_threshold": 0.6,  # 無音判定
-        
-        # メモリ効率化
-        "beam_size": 5,  # ビームサーチ最適化
+
+        # 軽量化オプション
+        "vad_filter": True,  # 無音区間スキップ
     }
-    
-    if enable_timestamps:
+
+    if high_accuracy:
+        # 高精度モード：ビームサーチ＋温度フォールバック
+        options.update({
+            "beam_size": 5,
+            "temperature": (0.0, 0.2, 0.4),
+            "condition_on_previous_text": True,
+        })
+    else:
+        # 高速モード：貪欲デコード＋短い温度フォールバック
+        # （温度を上げるのは品質フィルタに蹴られた区間だけなので通常は1パス）
+        options.update({
+            "beam_size": 1,
+            "best_of": 1,
+            "temperature": (0.0, 0.2, 0.4),
+            "condition_on_previous_text": True,
+        })
+
+    if enable_word_ts:
         options["word_timestamps"] = True
-    
+
     return options
 
 def calculate_quality_score(result):
@@ -226,136 +343,170 @@ def calculate_quality_score(result):
             base_score += 10
         if "。" in text or "、" in text:
             base_score += 5
-        if len(text.split()) > 5:
+        # 空白数で単語数を近似（split()のリスト生成を回避）
+        if text.count(' ') >= 5:
             base_score += 5
         
         return min(100, max(0, base_score))
     except:
         return 50
 
-def transcribe_audio_ultra(audio_file, language="auto", enable_timestamps=True, is_recording=False):
-    """超軽量・高精度文字起こし"""
-    
+@st.cache_data(max_entries=16, show_spinner=False)
+def _run_whisper(audio_bytes, language="auto", enable_timestamps=True, high_accuracy=False, enable_word_ts=False, _stream_placeholder=None):
+    """文字起こし本体（UI非依存）
+
+    同一音声・同一設定での再実行はバイト列ハッシュでキャッシュヒットし、
+    モデル推論を丸ごとスキップして即時返却する。
+    """
+    model = load_optimized_model()
+
+    # インメモリデコード（一時ファイル・ffmpegサブプロセス不要）
+    audio_data = decode_audio_bytes(audio_bytes)
+
+    # 音声品質向上（オプション）
+    try:
+        if len(audio_data) > 0:
+            audio_data = enhance_audio_quality(audio_data, 16000)
+    except:
+        # 音声強化に失敗した場合は元の音声をそのまま使用
+        pass
+
+    start_time = datetime.now()
+
+    # 最適化オプションで実行
+    options = optimize_whisper_options(language, enable_word_ts, high_accuracy)
+    audio_arr = np.asarray(audio_data, dtype=np.float32)
+
+    # 長尺音声はVADでチャンク分割し、複数コアでバッチ並列デコード
+    if len(audio_arr) / 16000 > 60:
+        from faster_whisper import BatchedInferencePipeline
+        batched = BatchedInferencePipeline(model)
+        # without_timestampsのデフォルトがWhisperModel.transcribeと異なるため
+        # 明示的にFalseを指定し、60秒境界でセグメント粒度が変わらないようにする
+        segments_iter, info = batched.transcribe(
+            audio_arr, batch_size=8, without_timestamps=False, **options
+        )
+    else:
+        segments_iter, info = model.transcribe(audio_arr, **options)
+
+    # セグメントを一度だけ展開してUI用のdict形式へ変換
+    # （プレースホルダが渡されていれば、生成と同時に途中経過テキストを表示）
+    if _stream_placeholder is not None:
+        segs = []
+        parts = []
+        for s in segments_iter:
+            segs.append(s)
+            parts.append(s.text)
+            _stream_placeholder.markdown("📝 " + "".join(parts))
+    else:
+        segs = list(segments_iter)
+    result = {
+        "text": "".join(s.text for s in segs),
+        "language": info.language,
+        "no_speech_prob": (
+            sum(s.no_speech_prob for s in segs) / len(segs) if segs else 1.0
+        ),
+        "segments": [
+            {"id": s.id, "start": s.start, "end": s.end, "text": s.text}
+            for s in segs
+        ],
+    }
+
+    # 現在時刻は1回だけ取得し、処理時間・タイムスタンプ・ファイル名で使い回す
+    end_time = datetime.now()
+    processing_time = (end_time - start_time).total_seconds()
+
+    # 元テキスト
+    original_text = result.get("text", "").strip()
+
+    # スマート修正適用
+    enhanced_text = apply_smart_corrections(original_text)
+
+    # 品質スコア計算
+    quality_score = calculate_quality_score(result)
+
+    # 文字数・単語数は一度だけ計算して使い回す
+    char_count = len(enhanced_text)
+    language_code = result.get("language", "unknown")
+    if language_code in ("ja", "zh", "ko"):
+        # CJKは空白区切りの単語が存在しないため文字数を採用
+        word_count = char_count
+    else:
+        word_count = enhanced_text.count(' ') + 1 if enhanced_text else 0
+
+    # 結果データ作成
+    transcription_result = {
+        "text": enhanced_text,
+        "original_text": original_text,
+        "language": language_code,
+        "processing_time": processing_time,
+        "model_used": "base (faster-whisper int8版)",
+        "char_count": char_count,
+        "word_count": word_count,
+        "timestamp": end_time.isoformat(),
+        "ts_compact": end_time.strftime('%Y%m%d_%H%M%S'),
+        "confidence": info.language_probability,
+        "quality_score": quality_score,
+        "enhanced": enhanced_text != original_text
+    }
+
+    # セグメント情報
+    segments = result["segments"] if enable_timestamps else None
+
+    return transcription_result, segments, quality_score
+
+# 文字起こしワーカー（モデルへの同時呼び出しを直列化しつつUIスレッドを解放）
+_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+def transcribe_audio_ultra(audio_bytes, language="auto", enable_timestamps=True, high_accuracy=False, enable_word_ts=False):
+    """超軽量・高精度文字起こし（進捗UI付きラッパー）"""
+
     progress_bar = st.progress(0)
     status_text = st.empty()
-    
+    stream_area = st.empty()
+
     try:
-        # Step 1: モデル読み込み（キャッシュ済み）
-        status_text.text("⚡ 高精度AIエンジン準備中...")
-        progress_bar.progress(15)
-        
-        model = load_optimized_model()
-        if model is None:
-            return None, None, None
-        
-        # Step 2: 音声ファイル処理
-        status_text.text("🎵 音声品質向上処理中...")
-        progress_bar.progress(30)
-        
-        # 一時ファイル作成
-        file_extension = ".wav" if is_recording else os.path.splitext(audio_file.name)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-            file_content = audio_file.getvalue() if hasattr(audio_file, 'getvalue') else audio_file.read()
-            tmp_file.write(file_content)
-            tmp_file_path = tmp_file.name
-        
-        # 音声品質向上（オプション）
-        try:
-            # librosaで音声読み込み＆前処理
-            audio_data, sr = librosa.load(tmp_file_path, sr=16000)
-            if len(audio_data) > 0:
-                enhanced_audio = enhance_audio_quality(audio_data, sr)
-                # 強化音声を一時ファイルに保存
-                enhanced_path = tmp_file_path.replace(file_extension, "_enhanced.wav")
-                import soundfile as sf
-                sf.write(enhanced_path, enhanced_audio, sr)
-                tmp_file_path = enhanced_path
-                status_text.text("✨ 音声品質向上完了！")
-        except:
-            # 音声強化に失敗した場合は元ファイルを使用
-            status_text.text("🎵 標準音声処理中...")
-        
-        progress_bar.progress(50)
-        
-        # Step 3: 最適化されたWhisper実行
         status_text.text("🚀 超高精度AI解析中...")
-        progress_bar.progress(70)
-        
-        start_time = datetime.now()
-        
-        # 最適化オプションで実行
-        options = optimize_whisper_options(language, enable_timestamps)
-        result = model.transcribe(tmp_file_path, **options)
-        
-        processing_time = (datetime.now() - start_time).total_seconds()
-        
-        # Step 4: 高精度テキスト後処理
-        status_text.text("📝 テキスト品質向上中...")
-        progress_bar.progress(85)
-        
-        # 元テキスト
-        original_text = result.get("text", "").strip()
-        
-        # スマート修正適用
-        enhanced_text = apply_smart_corrections(original_text)
-        
-        # 品質スコア計算
-        quality_score = calculate_quality_score(result)
-        
+
+        # 本体はワーカースレッドで実行し、完了までプログレスバーを更新し続ける
+        # （ワーカーはstream_areaへ途中経過テキストを逐次描画。
+        #   同じ音声＋設定の再実行はキャッシュヒットで即時完了）
+        ctx = get_script_run_ctx()
+
+        def _worker():
+            add_script_run_ctx(threading.current_thread(), ctx)
+            return _run_whisper(
+                audio_bytes, language, enable_timestamps,
+                high_accuracy, enable_word_ts,
+                _stream_placeholder=stream_area,
+            )
+
+        future = _EXECUTOR.submit(_worker)
+        progress = 10
+        while not future.done():
+            progress = min(95, progress + 2)
+            progress_bar.progress(progress)
+            time.sleep(0.2)
+        transcription_result, segments, quality_score = future.result()
+
         progress_bar.progress(100)
-        
-        # 結果データ作成
-        transcription_result = {
-            "text": enhanced_text,
-            "original_text": original_text,
-            "language": result.get("language", "unknown"),
-            "processing_time": processing_time,
-            "model_used": "base (超軽量・高精度版)",
-            "char_count": len(enhanced_text),
-            "word_count": len(enhanced_text.split()),
-            "timestamp": datetime.now().isoformat(),
-            "confidence": 1.0 - result.get("no_speech_prob", 0.0),
-            "quality_score": quality_score,
-            "enhanced": enhanced_text != original_text
-        }
-        
-        # セグメント情報
-        segments = None
-        if enable_timestamps and "segments" in result:
-            segments = result["segments"]
-        
-        # 一時ファイル削除
-        try:
-            os.unlink(tmp_file_path)
-            if "enhanced" in tmp_file_path:
-                original_path = tmp_file_path.replace("_enhanced.wav", file_extension)
-                if os.path.exists(original_path):
-                    os.unlink(original_path)
-        except:
-            pass
-        
+
         # UI要素をクリア
         progress_bar.empty()
         status_text.empty()
-        
+        stream_area.empty()
+
         # 成功メッセージ
         enhancement_msg = " (テキスト品質向上済み)" if transcription_result["enhanced"] else ""
-        st.success(f"🎉 超高精度文字起こし完了！ 処理時間: {processing_time:.2f}秒{enhancement_msg}")
-        
+        st.success(f"🎉 超高精度文字起こし完了！ 処理時間: {transcription_result['processing_time']:.2f}秒{enhancement_msg}")
+
         return transcription_result, segments, quality_score
-        
+
     except Exception as e:
         progress_bar.empty()
         status_text.empty()
+        stream_area.empty()
         st.error(f"❌ 処理エラー: {str(e)}")
-        
-        # エラー時のクリーンアップ
-        try:
-            if 'tmp_file_path' in locals():
-                os.unlink(tmp_file_path)
-        except:
-            pass
-        
         return None, None, None
 
 def display_quality_indicator(quality_score, enhanced=False):
@@ -386,34 +537,26 @@ def display_quality_indicator(quality_score, enhanced=False):
     </div>
     """, unsafe_allow_html=True)
 
-def format_time(seconds):
-    """秒を分:秒形式に変換"""
-    minutes = int(seconds // 60)
-    seconds = int(seconds % 60)
-    return f"{minutes:02d}:{seconds:02d}"
+def format_segment_times(segments):
+    """全セグメントの開始/終了秒を分:秒文字列へ一括変換（NumPyで1パス処理）"""
+    n = len(segments)
+    starts = np.fromiter((s.get("start", 0) for s in segments), dtype=np.int32, count=n)
+    ends = np.fromiter((s.get("end", 0) for s in segments), dtype=np.int32, count=n)
+    sm, ss = np.divmod(starts, 60)
+    em, es = np.divmod(ends, 60)
+    start_strs = [f"{m:02d}:{s:02d}" for m, s in zip(sm.tolist(), ss.tolist())]
+    end_strs = [f"{m:02d}:{s:02d}" for m, s in zip(em.tolist(), es.tolist())]
+    return start_strs, end_strs
 
 def main():
-    # タイトル
-    st.markdown("""
-    <h1 class="title">🚀 超軽量・高精度音声文字起こしツール</h1>
-    <div class="subtitle">baseモデル固定 + AI品質向上技術</div>
-    """, unsafe_allow_html=True)
+    # 初回表示時にバックグラウンドでモデルを先読み（初回クリックの待ち時間を隠蔽）
+    if "_warm" not in st.session_state:
+        st.session_state["_warm"] = True
+        threading.Thread(target=load_optimized_model, daemon=True).start()
 
-    # 機能バッジ
-    st.markdown("""
-    <div class="feature-badge">
-        <div class="badge badge-speed">⚡ 超軽量動作</div>
-        <div class="badge badge-accuracy">🎯 高精度認識</div>
-        <div class="badge badge-stable">🛡️ 完全安定</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # 機能説明
-    st.markdown("""
-    <div class="enhancement-info">
-        <strong>🔧 搭載技術:</strong> ノイズ除去・音量正規化・スマート文字修正・文脈認識・品質スコア算出
-    </div>
-    """, unsafe_allow_html=True)
+    # CSS＋ヘッダー（定数を1回のmarkdown呼び出しで描画）
+    st.markdown(_CSS, unsafe_allow_html=True)
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 
     # サイドバー設定（最小限）
     with st.sidebar:
@@ -422,29 +565,19 @@ def main():
         st.markdown("### 🌍 言語設定")
         language = st.selectbox(
             "認識言語",
-            options=["auto", "ja", "en", "zh", "ko"],
+            options=list(_LANG_LABELS),
             index=0,
-            format_func=lambda x: {
-                "auto": "🤖 自動検出",
-                "ja": "🇯🇵 日本語", 
-                "en": "🇺🇸 English",
-                "zh": "🇨🇳 中文",
-                "ko": "🇰🇷 한국어"
-            }.get(x, x)
+            format_func=_LANG_LABELS.get
         )
         
         st.markdown("### ⏰ オプション")
-        enable_timestamps = st.checkbox("タイムスタンプ有効", value=True)
+        enable_timestamps = st.checkbox("タイムスタンプ有効", value=True, help="セグメント単位（追加コストなし）")
+        enable_word_ts = st.checkbox("単語レベルタイムスタンプ", value=False, help="単語単位の詳細アライメント（処理時間増）")
         enable_enhancement = st.checkbox("音声品質向上", value=True, help="ノイズ除去・音量正規化を実行")
+        high_accuracy = st.checkbox("🎯 高精度モード", value=False, help="ビームサーチで精度優先（処理時間増）")
         
         st.markdown("---")
-        st.markdown("""
-        ### 📊 仕様
-        - **固定モデル**: base（74MB）
-        - **メモリ使用量**: 最小限
-        - **処理速度**: 最適化済み
-        - **安定性**: 100%保証
-        """)
+        st.markdown(_SIDEBAR_SPEC_MD)
 
     # メインコンテンツ
     col1, col2 = st.columns([1, 1])
@@ -459,26 +592,31 @@ def main():
         )
         
         if uploaded_file is not None:
-            file_size = len(uploaded_file.getvalue()) / (1024 * 1024)
-            
+            # サイズは属性から直接取得（バッファのフルコピー不要）
+            file_size = uploaded_file.size / (1024 * 1024)
+            audio_bytes = None
+
             if file_size > 25:
                 st.error("❌ ファイルサイズが25MBを超えています")
-            elif file_size > 10:
-                st.warning(f"⚠️ ファイルサイズ: {file_size:.1f}MB（10MB以下推奨）")
             else:
-                st.success(f"✅ ファイル選択済み: {uploaded_file.name} ({file_size:.1f}MB)")
-            
-            # 音声プレビュー
-            if uploaded_file.type.startswith('audio/'):
-                st.audio(uploaded_file.getvalue())
-        
+                # バッファの読み出しは一度だけ（getvalue()は毎回フルコピーを返す）
+                audio_bytes = uploaded_file.getvalue()
+                if file_size > 10:
+                    st.warning(f"⚠️ ファイルサイズ: {file_size:.1f}MB（10MB以下推奨）")
+                else:
+                    st.success(f"✅ ファイル選択済み: {uploaded_file.name} ({file_size:.1f}MB)")
+
+                # 音声プレビュー
+                if uploaded_file.type.startswith('audio/'):
+                    st.audio(audio_bytes)
+
         # 文字起こし実行ボタン
         if st.button("🚀 超高精度文字起こし開始", type="primary"):
             if uploaded_file is not None:
-                file_size = len(uploaded_file.getvalue()) / (1024 * 1024)
                 if file_size <= 25:
                     result, segments, quality_score = transcribe_audio_ultra(
-                        uploaded_file, language, enable_timestamps
+                        audio_bytes, language, enable_timestamps,
+                        high_accuracy=high_accuracy, enable_word_ts=enable_word_ts
                     )
                     if result:
                         st.session_state['result'] = result
@@ -502,7 +640,8 @@ def main():
             
             if st.button("🔍 録音音声を超高精度文字起こし", type="secondary"):
                 result, segments, quality_score = transcribe_audio_ultra(
-                    audio_value, language, enable_timestamps, is_recording=True
+                    audio_value.getvalue(), language, enable_timestamps,
+                    high_accuracy=high_accuracy, enable_word_ts=enable_word_ts
                 )
                 if result:
                     st.session_state['result'] = result
@@ -547,7 +686,7 @@ def main():
                 st.download_button(
                     "💾 高精度テキストをダウンロード",
                     data=result['text'],
-                    file_name=f"enhanced_transcription_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                    file_name=f"enhanced_transcription_{result['ts_compact']}.txt",
                     mime="text/plain"
                 )
             
@@ -577,7 +716,7 @@ def main():
                 st.download_button(
                     "💾 テキストをダウンロード",
                     data=result['text'],
-                    file_name=f"transcription_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                    file_name=f"transcription_{result['ts_compact']}.txt",
                     mime="text/plain"
                 )
         
@@ -586,28 +725,27 @@ def main():
             if segments and enable_timestamps:
                 st.markdown("### ⏰ タイムスタンプ付きセグメント")
                 
-                for segment in segments:
-                    start_time = segment.get("start", 0)
-                    end_time = segment.get("end", 0)
-                    text = segment.get("text", "").strip()
-                    
-                    start_formatted = format_time(start_time)
-                    end_formatted = format_time(end_time)
-                    
-                    st.markdown(f"""
-                    <div style="background: #f8f9fa; padding: 15px; margin: 10px 0; 
-                                border-radius: 10px; border-left: 4px solid #667eea;">
-                        <strong>[{start_formatted} - {end_formatted}]</strong><br>
-                        {text}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # JSON ダウンロード
-                segments_json = json.dumps(segments, ensure_ascii=False, indent=2)
+                # 全セグメントを1つのHTMLにまとめて一度だけ描画
+                # （セグメントごとのst.markdown呼び出し＝N回のUI更新を1回に集約）
+                parts = []
+                start_strs, end_strs = format_segment_times(segments)
+                for segment, start_formatted, end_formatted in zip(segments, start_strs, end_strs):
+                    text = html.escape(segment.get("text", "").strip())
+                    parts.append(
+                        f'<div style="background: #f8f9fa; padding: 15px; margin: 10px 0; '
+                        f'border-radius: 10px; border-left: 4px solid #667eea;">'
+                        f'<strong>[{start_formatted} - {end_formatted}]</strong><br>{text}</div>'
+                    )
+                st.markdown("".join(parts), unsafe_allow_html=True)
+
+                # JSON ダウンロード（orjsonはC実装・bytesのまま渡してデコードも省略）
+                segments_json = orjson.dumps(
+                    segments, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                )
                 st.download_button(
                     "💾 セグメントデータ（JSON）をダウンロード",
                     data=segments_json,
-                    file_name=f"segments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    file_name=f"segments_{result['ts_compact']}.json",
                     mime="application/json"
                 )
             else:
@@ -622,17 +760,13 @@ def main():
         for key in ['result', 'segments', 'quality_score']:
             if key in st.session_state:
                 del st.session_state[key]
+        gc.collect()  # 大きな結果オブジェクトを即時回収
         st.success("✅ 全てクリアしました")
         st.rerun()
     
     # フッター
     st.markdown("---")
-    st.markdown("""
-    <div style="text-align: center; color: #666; padding: 1rem;">
-        <p>🚀 <strong>超軽量・高精度音声文字起こしツール</strong></p>
-        <p>baseモデル固定 + AI品質向上技術による最強軽量版</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()